@@ -0,0 +1,37 @@
+# Prepares a freshly initialized database cluster to act as replication primary.
+# Creates the replication role (and slot if specified) and allows it to connect for replication.
+# Run by the Postgres image's docker-entrypoint.sh (linked into /docker-entrypoint-initdb.d),
+# so this only happens once, when the data directory is initialized.
+# Usage: init_replication.sh (configured through REPLICATION_* environment variables)
+#! bin/bash
+set -e
+
+# Same default and case handling as entrypoint.py
+replication_mode=$(echo "${REPLICATION_MODE:-primary}" | tr '[:upper:]' '[:lower:]')
+
+if [ "$replication_mode" != "primary" ]; then
+    echo "Replication mode is not 'primary', skipping replication setup."
+    exit 0
+elif [ -z "$REPLICATION_PASSWORD" ]; then
+    echo "No replication password provided (REPLICATION_PASSWORD)! Skipping replication setup."
+    exit 0
+fi
+
+replication_user=${REPLICATION_USER:-replicator}
+
+echo "Replication setup 1/3: Creating replication role '${replication_user}'..."
+psql -v ON_ERROR_STOP=1 -U "${POSTGRES_USER:-postgres}" -d "postgres" \
+    -v user="$replication_user" -v password="$REPLICATION_PASSWORD" \
+    <<< "CREATE ROLE :\"user\" WITH REPLICATION LOGIN PASSWORD :'password';"
+
+if [ -n "$REPLICATION_SLOT" ]; then
+    echo "Replication setup 2/3: Creating physical replication slot '${REPLICATION_SLOT}'..."
+    psql -v ON_ERROR_STOP=1 -U "${POSTGRES_USER:-postgres}" -d "postgres" \
+        -v slot="$REPLICATION_SLOT" \
+        <<< "SELECT pg_create_physical_replication_slot(:'slot');"
+else
+    echo "Replication setup 2/3: No replication slot specified (REPLICATION_SLOT), skipping."
+fi
+
+echo "Replication setup 3/3: Allowing replication connections for '${replication_user}'..."
+echo "host replication ${replication_user} all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -46,8 +46,11 @@ loop.set_debug(DEBUG) # Set asyncio event loop debug mode when launched in debug
 #--------------------------- [Core Routes] ---------------------------#
 #=====================================================================#
 from source.modules.backup import get_backups, try_create_backup, try_restore_backup
-from werkzeug.exceptions import InternalServerError, BadRequest
-from source.modules.utils import filename_validator
+from source.modules.replication import is_standby, get_replication_status, get_backup_lag_violation
+from source.modules.logs import LOG_LEVELS, MAX_TAIL_ENTRIES, LogFilter, get_log_files, stream_logs, tail_logs
+from werkzeug.exceptions import InternalServerError, BadRequest, NotFound, ServiceUnavailable
+from source.env import REPLICATION_MAX_LAG, REPLICATION_LAG_POLICY
+from source.modules.utils import filename_validator, timestamp_validator, positive_integer_validator
 
 
 @quart_app.post("/echo")
@@ -81,25 +84,147 @@ async def backups_get(request_data : dict):
 async def backups_post(request_data : dict):
     """
     Create a new backup or restore an existing one.
+    On a standby, backups are refused (or only warned about, depending on REPLICATION_LAG_POLICY)
+    while the replication lag exceeds REPLICATION_MAX_LAG. Restores are never possible on a standby.
 
     """
     database = request_data['database']
     action = request_data['action']
     filename = request_data['filename']
+    response_data = { 'database': database, 'action': action }
     
     if database == 'postgres':
         raise BadRequest("Database name cannot be 'postgres'!")
 
     if action == 'create':
+        # Check replication lag (only relevant on a standby)
+        lag_violation = await get_backup_lag_violation()
+        if lag_violation and REPLICATION_LAG_POLICY == 'refuse':
+            raise ServiceUnavailable(f"{lag_violation} Backup was not created.")
+        elif lag_violation:
+            logger.warning(f"{lag_violation} Creating backup anyway.")
+            response_data['warning'] = lag_violation
+
         # Create new backup
         success, filename = await try_create_backup(database, filename)
         if not success:
             raise InternalServerError("Backup was not created!")
 
     elif action == 'restore':
+        # Standbys are read-only, restores have to happen on the primary
+        if await is_standby():
+            raise BadRequest("Backups cannot be restored on a standby!")
+
         # Restore from existing backup
         success = await try_restore_backup(database, filename)
         if not success:
             raise InternalServerError("Backup was not restored! This might be super bad!")
 
-    return 200, { 'database': database, 'action': action, 'name': filename }
+    return 200, { **response_data, 'name': filename }
+
+
+@quart_app.get('/replication')
+@api_method()
+async def replication_get(request_data : dict):
+    """
+    Get the replication role and lag of this instance.
+
+    """
+    return 200, { **await get_replication_status(), 'max_lag': REPLICATION_MAX_LAG, 'lag_policy': REPLICATION_LAG_POLICY }
+
+
+#=====================================================================#
+#---------------------------- [Log Routes] ---------------------------#
+#=====================================================================#
+LOG_FILTER_ARGUMENT_RULES = {
+    'file': {
+        'optional': True,
+        'allowed_types': [ str ],
+        'validator': filename_validator
+    },
+    'since': {
+        'optional': True,
+        'allowed_types': [ str ],
+        'validator': timestamp_validator
+    },
+    'until': {
+        'optional': True,
+        'allowed_types': [ str ],
+        'validator': timestamp_validator
+    },
+    'process': {
+        'optional': True,
+        'allowed_types': [ str ],
+        'transformer': lambda x: x.lower()
+    },
+    'pipe': {
+        'optional': True,
+        'allowed_types': [ str ],
+        'allowed_values': ['stdout', 'stderr'],
+        'transformer': lambda x: x.lower()
+    },
+    'level': {
+        'optional': True,
+        'allowed_types': [ str ],
+        'allowed_values': [ level.lower() for level in LOG_LEVELS ],
+        'transformer': lambda x: x.lower()
+    }
+}
+
+
+def _get_log_filter(request_data : dict) -> LogFilter:
+    """
+    Creates a LogFilter from the sanitized log filter arguments.
+    Raises NotFound if a log file was specified that doesn't exist.
+
+    """
+    file = request_data.get('file')
+    if file and file not in get_log_files():
+        raise NotFound(f"Log file '{file}' doesn't exist!")
+
+    return LogFilter(
+        since=request_data.get('since'),
+        until=request_data.get('until'),
+        process=request_data.get('process'),
+        pipe=request_data.get('pipe'),
+        level=request_data.get('level')
+    )
+
+
+@quart_app.get('/logs')
+@api_method({
+    **LOG_FILTER_ARGUMENT_RULES,
+    'limit': {
+        'optional': True,
+        'allowed_types': [ str, int ],
+        'validator': positive_integer_validator
+    }
+})
+async def logs_get(request_data : dict):
+    """
+    Search the log files, streaming matching entries (oldest first) as newline delimited JSON.
+
+    """
+    log_filter = _get_log_filter(request_data)
+    limit = int(request_data.get('limit', 1000))
+    return 200, stream_logs(log_filter, limit, request_data.get('file'))
+
+
+@quart_app.get('/logs/tail')
+@api_method({
+    **LOG_FILTER_ARGUMENT_RULES,
+    'entries': {
+        'optional': True,
+        'allowed_types': [ str, int ],
+        'validator': lambda x: positive_integer_validator(x, MAX_TAIL_ENTRIES)
+    }
+})
+async def logs_tail_get(request_data : dict):
+    """
+    Return the last log entries matching the filter (oldest first).
+
+    """
+    log_filter = _get_log_filter(request_data)
+    count = int(request_data.get('entries', 100))
+    entries = await asyncio.to_thread(tail_logs, log_filter, count, request_data.get('file'))
+    return 200, { 'entries': [ entry.to_dict() for entry in entries ] }
@@ -14,6 +14,9 @@ parser.add_argument('-da', '--database_conn_async', type=str, help="Async databa
 parser.add_argument('-qh', '--quart_host', type=str, help="Host-IP of the Quart webserver, defaults to '127.0.0.1'")
 parser.add_argument('-qp', '--quart_port', type=int, help="Host-Port of the Quart webserver, defaults to 5000")
 parser.add_argument('-qs', '--quart_secret_key', type=str, help="Secret key for Quart webserver")
+# Replication arguments
+parser.add_argument('-rl', '--replication_max_lag', type=float, help="Max. replication lag in seconds for backups on a standby, defaults to 300")
+parser.add_argument('-rp', '--replication_lag_policy', type=str, help="What to do with backups past the max. replication lag ('refuse' or 'warn'), defaults to 'refuse'")
 args = parser.parse_args()
 
 # Global constants
@@ -28,8 +31,12 @@ DB_CONN_ASYNC = args.database_conn_async or os.getenv('DB_CONN_ASYNC')
 QUART_HOST = args.quart_host or os.getenv('QUART_HOST') or '127.0.0.1'
 QUART_PORT = args.quart_port or int(os.getenv('QUART_PORT')) if os.getenv('QUART_PORT') else None or 5000
 QUART_SECRET_KEY = args.quart_secret_key or os.getenv('QUART_SECRET_KEY')
+# Replication constants
+REPLICATION_MAX_LAG = args.replication_max_lag or (float(os.getenv('REPLICATION_MAX_LAG')) if os.getenv('REPLICATION_MAX_LAG') else 300.0)
+REPLICATION_LAG_POLICY = (args.replication_lag_policy or os.getenv('REPLICATION_LAG_POLICY') or 'refuse').lower()
 
 # Environment validation
 if not DB_CONN_SYNC: raise Exception("No sync database connection string specified!")
 if not DB_CONN_ASYNC: raise Exception("No async database connection string specified!")
 if not QUART_SECRET_KEY: raise Exception("No secret key specified!")
+if REPLICATION_LAG_POLICY not in ['refuse', 'warn']: raise Exception(f"Unknown replication lag policy: {REPLICATION_LAG_POLICY}")
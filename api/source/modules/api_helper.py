@@ -1,7 +1,8 @@
 from source.env import DEBUG
 from quart import Response, request, current_app
 from werkzeug.exceptions import HTTPException
-from typing import Any, List
+from typing import Any, AsyncIterator, List
+import inspect
 import logging
 
 
@@ -105,6 +106,27 @@ def _sanitize_arguments(argument_rules : dict, arguments : dict):
     return sanitized
 
 
+async def _stream_json_lines(func_name : str, json_dumps, items : AsyncIterator[Any]) -> AsyncIterator[str]:
+    """
+    Serializes the items of a streamed API response as newline delimited JSON.
+    The status code has already been sent at this point, so exceptions are logged and reported
+    through a final error line, which lets clients tell a truncated result from a complete one.
+    If the stream is cancelled (client disconnected), nothing can be sent anymore and the items are just closed.
+
+    """
+    try:
+        async for item in items:
+            yield json_dumps(item) + '\n'
+
+    except Exception as ex:
+        logger.exception(f"Exception during streaming of API method '{func_name}'!")
+        error_message = f"500 Internal Server Error: {str(ex)}" if DEBUG else "500 Internal Server Error"
+        yield json_dumps({ 'error': error_message }) + '\n'
+
+    finally:
+        await items.aclose()
+
+
 def api_method(argument_rules : dict = {}, sanitize_arguments : bool = True):
     """
     Decorator to specify some common behaviors for API methods.
@@ -113,13 +135,25 @@ def api_method(argument_rules : dict = {}, sanitize_arguments : bool = True):
     processed by _sanitize_arguments before passing them through to the wrapped function.
     That way, any arguments the client sends that aren't part of the API provided argument
     rules will be discarded.
+    If the request has no JSON body, the query string arguments are used instead.
+
+    If the wrapped function returns an async generator as response data, its items are
+    streamed to the client as newline delimited JSON instead of a single response object.
 
     """
     def decorator(func):
         async def wrapper():
             try:
-                arguments = _sanitize_arguments(argument_rules, await request.get_json()) if sanitize_arguments else await request.get_json()
+                request_arguments = await request.get_json()
+                if request_arguments is None:
+                    request_arguments = request.args.to_dict()
+                arguments = _sanitize_arguments(argument_rules, request_arguments) if sanitize_arguments else request_arguments
                 response_status, response_data = await func(arguments)
+                if inspect.isasyncgen(response_data):
+                    func_name = getattr(func, '__name__', 'Unkown')
+                    response = Response(_stream_json_lines(func_name, current_app.json.dumps, response_data), status=response_status, mimetype='application/x-ndjson')
+                    response.timeout = None # Streams are bounded by the API method, RESPONSE_TIMEOUT would silently cut them off
+                    return response
                 return Response(current_app.json.dumps({ 'status': response_status, 'data': response_data }) + '\n', status=response_status, mimetype='application/json')
             
             except ArgumentSanitizationError as ex:
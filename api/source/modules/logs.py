@@ -0,0 +1,407 @@
+"""
+Search and tail functionality for the log files written by the process supervisor (entrypoint.py).
+
+Every supervisor log line starts with a fixed width '%Y-%m-%d %H:%M:%S' timestamp, followed by
+a process tag ('[Postgres > stderr]', '[QuartAPI > stdout]', '[Supervisor]') and the message.
+Lines not starting with a timestamp (tracebacks) are continuations of the previous entry.
+
+Because the timestamp prefix is fixed width, timestamps can be compared as raw bytes. Log files
+are memory-mapped and a sparse offset index (one timestamp / offset pair every INDEX_STRIDE bytes)
+is built lazily per file. The index is cached and only extended when a file grows, so a time range
+query binary-searches the index and scans at most INDEX_STRIDE bytes before the first hit.
+
+"""
+from source.env import PATH_LOGS
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from bisect import bisect_left, bisect_right
+import threading
+import asyncio
+import logging
+import mmap
+import os
+import re
+
+
+logger = logging.getLogger('log_search')
+
+TIMESTAMP_LENGTH = 19 # len('YYYY-MM-DD HH:MM:SS')
+INDEX_STRIDE = 64 * 1024 # Distance in bytes between two sparse index entries
+MAX_TAIL_ENTRIES = 10000 # Tail results are returned as a single response, so they have to be bounded
+STREAM_BATCH_SIZE = 500 # Number of entries read from disk (in a worker thread) per streamed batch
+LEVEL_SEARCH_LENGTH = 80 # Only the start of a message is searched for its level
+LOG_LEVELS = ['DEBUG', 'INFO', 'NOTICE', 'LOG', 'WARNING', 'ERROR', 'FATAL', 'CRITICAL', 'PANIC']
+
+_ENTRY_START_PATTERN = re.compile(rb'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} ')
+_LEVEL_PATTERN = re.compile(rb'\b(' + b'|'.join(level.encode() for level in LOG_LEVELS) + rb')\b')
+
+
+class LogEntry():
+    """
+    Represents a single (possibly multi-line) entry of a supervisor log file.
+
+    """
+    file : str
+    offset : int
+    timestamp : str
+    process : Optional[str]
+    pipe : Optional[str]
+    level : Optional[str]
+    message : str
+
+    def __init__(self, file : str, offset : int, raw : bytes):
+        self.file = file
+        self.offset = offset
+        self.timestamp = raw[:TIMESTAMP_LENGTH].decode('ascii')
+        self.process = None
+        self.pipe = None
+
+        # Split off process tag ('[<process> > <pipe>]' or '[<process>]')
+        remainder = raw[TIMESTAMP_LENGTH + 1:]
+        if remainder.startswith(b'['):
+            tag_end = remainder.find(b']')
+            if tag_end > 0:
+                process, _, pipe = remainder[1:tag_end].decode('utf-8', errors='replace').partition(' > ')
+                self.process = process
+                self.pipe = pipe or None
+                remainder = remainder[tag_end + 1:].lstrip(b' ')
+
+        # Postgres ('LOG:', 'ERROR:', ...) and the API ('INFO', 'WARNING', ...) both
+        # put the level near the start of the message, so take the first match there
+        level_match = _LEVEL_PATTERN.search(remainder, 0, LEVEL_SEARCH_LENGTH)
+        self.level = level_match.group(1).decode('ascii') if level_match else None
+        self.message = remainder.decode('utf-8', errors='replace').rstrip('\n')
+
+    def to_dict(self) -> dict:
+        return {
+            'file': self.file,
+            'offset': self.offset,
+            'timestamp': self.timestamp,
+            'process': self.process,
+            'pipe': self.pipe,
+            'level': self.level,
+            'message': self.message
+        }
+
+
+class LogFilter():
+    """
+    Filter criteria for log entries. Every criteria left as None matches all entries.
+    Process, pipe and level are compared case-insensitively.
+
+    """
+    since : Optional[bytes]
+    until : Optional[bytes]
+    process : Optional[str]
+    pipe : Optional[str]
+    level : Optional[str]
+
+    def __init__(self, since : Optional[str] = None, until : Optional[str] = None, process : Optional[str] = None, pipe : Optional[str] = None, level : Optional[str] = None):
+        self.since = since.encode('ascii') if since else None
+        self.until = until.encode('ascii') if until else None
+        self.process = process.lower() if process else None
+        self.pipe = pipe.lower() if pipe else None
+        self.level = level.lower() if level else None
+
+    def matches(self, entry : LogEntry) -> bool:
+        if self.process and (entry.process or '').lower() != self.process: return False
+        if self.pipe and (entry.pipe or '').lower() != self.pipe: return False
+        if self.level and (entry.level or '').lower() != self.level: return False
+        return True
+
+
+class LogFileIndex():
+    """
+    Sparse, lazily built index over a log file, mapping entry timestamps to byte offsets.
+    Log files are append-only, so the index is extended when the file grows and
+    rebuilt only if the file was replaced or truncated.
+
+    """
+    path : str
+    _lock : threading.Lock
+    _inode : Optional[int]
+    _indexed_size : int
+    _timestamps : List[bytes]
+    _offsets : List[int]
+
+    def __init__(self, path : str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, inode : Optional[int]):
+        self._inode = inode
+        self._indexed_size = 0
+        self._timestamps = []
+        self._offsets = []
+
+    @property
+    def first_timestamp(self) -> Optional[bytes]:
+        return self._timestamps[0] if self._timestamps else None
+
+    def update(self, mapped : mmap.mmap | bytes, inode : int, size : int):
+        """
+        Extends the index up to size (which has to be a line boundary).
+
+        """
+        with self._lock:
+            if inode != self._inode or size < self._indexed_size:
+                if self._inode is not None:
+                    logger.debug(f"Log file '{self.path}' was replaced or truncated, rebuilding index...")
+                self._reset(inode)
+
+            if size == self._indexed_size:
+                return
+
+            position = self._offsets[-1] + INDEX_STRIDE if self._offsets else 0
+            while position < size:
+                entry_start = _find_entry_start(mapped, position, size)
+                if entry_start < 0: break
+                self._timestamps.append(mapped[entry_start:entry_start + TIMESTAMP_LENGTH])
+                self._offsets.append(entry_start)
+                position = entry_start + INDEX_STRIDE
+
+            self._indexed_size = size
+
+    def find_offset(self, timestamp : bytes) -> int:
+        """
+        Returns an offset from which scanning forward will encounter all entries at or after timestamp.
+
+        """
+        with self._lock:
+            i = bisect_left(self._timestamps, timestamp) - 1
+            return self._offsets[i] if i >= 0 else 0
+
+    def find_end_offset(self, timestamp : bytes, size : int) -> int:
+        """
+        Returns an offset (line boundary) from which scanning backward will encounter all entries at or before timestamp.
+
+        """
+        with self._lock:
+            i = bisect_right(self._timestamps, timestamp)
+            return self._offsets[i] if i < len(self._offsets) else size
+
+
+_index_cache : Dict[str, LogFileIndex] = {}
+_index_cache_lock = threading.Lock()
+
+
+def _get_index(path : str) -> LogFileIndex:
+    with _index_cache_lock:
+        index = _index_cache.get(path)
+        if index is None:
+            index = _index_cache[path] = LogFileIndex(path)
+        return index
+
+
+def _prune_index_cache(paths : List[str]):
+    """
+    Removes cached indexes of log files that aren't in paths anymore (deleted or rotated out).
+
+    """
+    with _index_cache_lock:
+        for path in _index_cache.keys() - set(paths):
+            logger.debug(f"Log file '{path}' doesn't exist anymore, removing its index...")
+            del _index_cache[path]
+
+
+def _find_entry_start(mapped : mmap.mmap | bytes, position : int, end : int) -> int:
+    """
+    Returns the offset of the first entry starting at or after position, or -1 if there is none before end.
+
+    """
+    if position > 0:
+        # Align to the start of the next line, unless position already is one
+        position = mapped.find(b'\n', position - 1, end) + 1
+        if position == 0: return -1
+
+    while position < end:
+        if _ENTRY_START_PATTERN.match(mapped, position, end):
+            return position
+        line_end = mapped.find(b'\n', position, end)
+        if line_end < 0: return -1
+        position = line_end + 1
+
+    return -1
+
+
+def _iter_entries(mapped : mmap.mmap | bytes, start : int, end : int) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yields (offset, raw entry) for every entry between start and end (which has to be a line boundary).
+
+    """
+    position = _find_entry_start(mapped, start, end)
+    if position < 0: return
+
+    while position < end:
+        entry_end = mapped.find(b'\n', position, end) + 1
+        while entry_end < end and not _ENTRY_START_PATTERN.match(mapped, entry_end, end):
+            entry_end = mapped.find(b'\n', entry_end, end) + 1
+        yield position, mapped[position:entry_end]
+        position = entry_end
+
+
+def _iter_entries_reversed(mapped : mmap.mmap | bytes, end : int) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yields (offset, raw entry) for every entry before end (which has to be a line boundary), newest first.
+
+    """
+    entry_end = end
+    line_end = end
+    while line_end > 0:
+        line_start = mapped.rfind(b'\n', 0, line_end - 1) + 1
+        if _ENTRY_START_PATTERN.match(mapped, line_start, line_end):
+            yield line_start, mapped[line_start:entry_end]
+            entry_end = line_start
+        line_end = line_start
+
+
+@contextmanager
+def _map_log_file(path : str) -> Iterator[Tuple[mmap.mmap | bytes, int, int]]:
+    """
+    Memory-maps a log file for reading.
+    Yields the mapping, the file's inode and the size up to the last complete line.
+
+    """
+    with open(path, 'rb') as file:
+        stat = os.fstat(file.fileno())
+        if stat.st_size == 0:
+            # Empty files can't be mapped
+            yield b'', stat.st_ino, 0
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped, stat.st_ino, mapped.rfind(b'\n') + 1
+
+
+def get_log_files() -> List[str]:
+    """
+    Returns the names of all log files, oldest first.
+    Log file names are prefixed with their creation timestamp, so sorting by name suffices.
+    Indexes of log files that don't exist anymore are removed from the cache.
+
+    """
+    logger.debug(f"Fetching log file list...")
+    log_files = sorted(name for name in os.listdir(PATH_LOGS) if name.endswith('.log'))
+    _prune_index_cache([ os.path.join(PATH_LOGS, name) for name in log_files ])
+    return log_files
+
+
+def search_logs(log_filter : LogFilter, file_name : Optional[str] = None) -> Iterator[LogEntry]:
+    """
+    Yields all entries matching the filter, oldest first.
+    Searches only the specified log file if file_name is provided, otherwise all log files.
+
+    """
+    for current_file_name in [ file_name ] if file_name else get_log_files():
+        path = os.path.join(PATH_LOGS, current_file_name)
+        with _map_log_file(path) as (mapped, inode, size):
+            index = _get_index(path)
+            index.update(mapped, inode, size)
+
+            # Log files are chronological, so no later file can contain matching entries either
+            if log_filter.until and index.first_timestamp and index.first_timestamp > log_filter.until:
+                return
+
+            start = index.find_offset(log_filter.since) if log_filter.since else 0
+            for offset, raw in _iter_entries(mapped, start, size):
+                timestamp = raw[:TIMESTAMP_LENGTH]
+                if log_filter.since and timestamp < log_filter.since: continue
+                if log_filter.until and timestamp > log_filter.until: return
+                entry = LogEntry(current_file_name, offset, raw)
+                if log_filter.matches(entry):
+                    yield entry
+
+
+def tail_logs(log_filter : LogFilter, count : int, file_name : Optional[str] = None) -> List[LogEntry]:
+    """
+    Returns the last count entries matching the filter, oldest first.
+    Reads the log files backwards, starting at the end of the file (or the indexed position after until),
+    so only the end of the matching time range has to be touched.
+
+    """
+    entries : List[LogEntry] = []
+    for current_file_name in [ file_name ] if file_name else reversed(get_log_files()):
+        path = os.path.join(PATH_LOGS, current_file_name)
+        with _map_log_file(path) as (mapped, inode, size):
+            end = size
+            if log_filter.until:
+                index = _get_index(path)
+                index.update(mapped, inode, size)
+                end = index.find_end_offset(log_filter.until, size)
+
+            for offset, raw in _iter_entries_reversed(mapped, end):
+                timestamp = raw[:TIMESTAMP_LENGTH]
+                if log_filter.until and timestamp > log_filter.until: continue
+                # Log files are chronological, so no earlier file can contain matching entries either
+                if log_filter.since and timestamp < log_filter.since: return entries[::-1]
+                entry = LogEntry(current_file_name, offset, raw)
+                if log_filter.matches(entry):
+                    entries.append(entry)
+                    if len(entries) >= count:
+                        return entries[::-1]
+
+    return entries[::-1]
+
+
+class _EntryBatchReader():
+    """
+    Reads entries from a search_logs generator in batches, from worker threads.
+    A generator can't be closed while executing, so closing it while a batch is being read
+    is deferred to the worker thread, which closes it (releasing the log file) once the batch is done.
+
+    """
+    _entries : Iterator[LogEntry]
+    _lock : threading.Lock
+    _reading : bool
+    _close_requested : bool
+
+    def __init__(self, entries : Iterator[LogEntry]):
+        self._entries = entries
+        self._lock = threading.Lock()
+        self._reading = False
+        self._close_requested = False
+
+    def read(self, count : int) -> List[LogEntry]:
+        with self._lock:
+            if self._close_requested: return []
+            self._reading = True
+
+        try:
+            batch = []
+            for entry in self._entries:
+                batch.append(entry)
+                if len(batch) >= count or self._close_requested: break
+            return batch
+
+        finally:
+            with self._lock:
+                self._reading = False
+                if self._close_requested:
+                    self._entries.close()
+
+    def close(self):
+        with self._lock:
+            self._close_requested = True
+            if not self._reading:
+                self._entries.close()
+
+
+async def stream_logs(log_filter : LogFilter, limit : int, file_name : Optional[str] = None) -> AsyncIterator[dict]:
+    """
+    Streams up to limit entries matching the filter, oldest first.
+    Entries are read in batches in a worker thread, so large scans don't block the event loop.
+
+    """
+    reader = _EntryBatchReader(search_logs(log_filter, file_name))
+    remaining = limit
+    try:
+        while remaining > 0:
+            batch = await asyncio.to_thread(reader.read, min(remaining, STREAM_BATCH_SIZE))
+            if not batch: break
+            for entry in batch:
+                yield entry.to_dict()
+            remaining -= len(batch)
+
+    finally:
+        reader.close() # Safe even if the stream was cancelled while a batch is still being read
@@ -0,0 +1,135 @@
+from source.env import REPLICATION_MAX_LAG
+from asyncio import create_subprocess_exec
+from asyncio.subprocess import PIPE
+from typing import Any, Optional
+import asyncio
+import logging
+import json
+
+
+logger = logging.getLogger('database_replication')
+
+REPLAY_STALL_CHECK_DELAY = 1.0 # Seconds between the two samples used to tell a stalled replay from WAL that just arrived
+
+
+# Lag is 0 while the WAL receiver is streaming and everything received has been replayed,
+# otherwise it's the age of the last replayed transaction (NULL if none was replayed yet).
+# That age is only meaningful if replay has actually stalled: After the primary was idle, the first
+# WAL record to arrive would briefly report the whole idle time as lag (see _get_standby_status).
+_STANDBY_STATUS_QUERY = """
+SELECT json_build_object(
+    'receiver_status', receiver.status,
+    'sender_host', receiver.sender_host,
+    'sender_port', receiver.sender_port,
+    'receive_lsn', pg_last_wal_receive_lsn(),
+    'replay_lsn', pg_last_wal_replay_lsn(),
+    'last_replay_timestamp', pg_last_xact_replay_timestamp(),
+    'lag_bytes', pg_wal_lsn_diff(pg_last_wal_receive_lsn(), pg_last_wal_replay_lsn()),
+    'lag_seconds', CASE
+        WHEN receiver.status = 'streaming' AND pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+)
+FROM (SELECT 1) AS dummy LEFT JOIN pg_stat_wal_receiver AS receiver ON true
+"""
+
+_PRIMARY_STATUS_QUERY = """
+SELECT coalesce(json_agg(json_build_object(
+    'application_name', application_name,
+    'client_addr', client_addr,
+    'state', state,
+    'sync_state', sync_state,
+    'replay_lsn', replay_lsn,
+    'lag_bytes', pg_wal_lsn_diff(pg_current_wal_lsn(), replay_lsn),
+    'lag_seconds', EXTRACT(EPOCH FROM replay_lag)
+)), '[]')
+FROM pg_stat_replication
+"""
+
+
+def _parse_lsn(lsn : str) -> int:
+    """
+    Converts a textual LSN ('16/B374D848') to its integer position.
+
+    """
+    high, low = lsn.split('/')
+    return (int(high, 16) << 32) | int(low, 16)
+
+
+async def _execute_json_query(query : str) -> Any:
+    """
+    Executes a query returning a single JSON value against the local Postgres instance and returns the parsed result.
+
+    """
+    process = await create_subprocess_exec('psql', '--no-psqlrc', '--tuples-only', '--no-align', '-U', 'postgres', '-d', 'postgres', '-c', query, stdout=PIPE, stderr=PIPE)
+    stdout, stderr = await process.communicate()
+    if process.returncode > 0:
+        raise Exception(f"Query failed: {stderr.decode('utf-8').strip()}")
+
+    return json.loads(stdout.decode('utf-8'))
+
+
+async def is_standby() -> bool:
+    """
+    Returns wether the local Postgres instance is a standby (in recovery).
+    Checked on every call, so a promoted standby is recognized as primary right away.
+
+    """
+    return await _execute_json_query("SELECT to_json(pg_is_in_recovery())")
+
+
+async def _get_standby_status() -> dict:
+    """
+    Returns the WAL receiver state and replication lag of the local standby.
+    If received WAL is still waiting to be replayed, the status is sampled a second time to check
+    wether replay is stalled. If the pending WAL was replayed in the meantime, the lag is at most
+    REPLAY_STALL_CHECK_DELAY, regardless of how old the last replayed transaction is.
+
+    """
+    status = await _execute_json_query(_STANDBY_STATUS_QUERY)
+    if status['receiver_status'] != 'streaming' or not status['lag_bytes']:
+        return status
+
+    await asyncio.sleep(REPLAY_STALL_CHECK_DELAY)
+    resampled = await _execute_json_query(_STANDBY_STATUS_QUERY)
+    if resampled['replay_lsn'] and _parse_lsn(resampled['replay_lsn']) >= _parse_lsn(status['receive_lsn']):
+        lag_seconds = resampled['lag_seconds']
+        resampled['lag_seconds'] = min(lag_seconds, REPLAY_STALL_CHECK_DELAY) if lag_seconds is not None else REPLAY_STALL_CHECK_DELAY
+
+    return resampled
+
+
+async def get_replication_status() -> dict:
+    """
+    Returns the replication role of the local Postgres instance.
+    For a standby, the WAL receiver state and replication lag is included.
+    For a primary, the state and lag of every connected standby is included.
+
+    """
+    logger.debug(f"Fetching replication status...")
+    if await is_standby():
+        return { 'role': 'standby', **await _get_standby_status() }
+    else:
+        return { 'role': 'primary', 'standbys': await _execute_json_query(_PRIMARY_STATUS_QUERY) }
+
+
+async def get_backup_lag_violation() -> Optional[str]:
+    """
+    Returns a reason if the local Postgres instance is a standby lagging further behind its
+    primary than REPLICATION_MAX_LAG allows for backups, otherwise None.
+    Unknown lag (nothing replayed yet) counts as violation, as the standby's data age can't be determined.
+    On a primary, only the role is checked.
+
+    """
+    if not await is_standby():
+        return None
+
+    status = await _get_standby_status()
+
+    lag_seconds = status['lag_seconds']
+    if lag_seconds is None:
+        return f"Replication lag of standby is unknown (WAL receiver: {status['receiver_status'] or 'not running'})!"
+    if lag_seconds > REPLICATION_MAX_LAG:
+        return f"Replication lag of standby ({lag_seconds:.1f}s) exceeds the maximum of {REPLICATION_MAX_LAG:.1f}s!"
+
+    return None
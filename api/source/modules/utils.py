@@ -21,6 +21,36 @@ def filename_validator(filename : str):
         raise ArgumentValidationError("Not a valid filename")
 
 
+def timestamp_validator(timestamp : str):
+    """
+    Validates an API argument provided timestamp in the log file format ('%Y-%m-%d %H:%M:%S').
+    Raises ArgumentValidationError if invalid.
+
+    """
+    # Log timestamps are compared as fixed width strings, so the timestamp has to be zero padded as well
+    try:
+        valid = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S').strftime('%Y-%m-%d %H:%M:%S') == timestamp
+    except ValueError:
+        valid = False
+    if not valid:
+        raise ArgumentValidationError("Not a valid timestamp (expected format 'YYYY-MM-DD HH:MM:SS')")
+
+
+def positive_integer_validator(value : int | str, maximum : int | None = None):
+    """
+    Validates an API argument provided positive integer (or its string representation, for query arguments).
+    If maximum is specified, the integer must not be greater than it.
+    Raises ArgumentValidationError if invalid.
+
+    """
+    if isinstance(value, str) and not value.isdecimal():
+        raise ArgumentValidationError("Not a valid integer")
+    if int(value) <= 0:
+        raise ArgumentValidationError("Must be greater than 0")
+    if maximum is not None and int(value) > maximum:
+        raise ArgumentValidationError(f"Must not be greater than {maximum}")
+
+
 def get_timestamped_filename(filename : str, extension : str = '') -> str:
     """
     Returns a filename with current UTC timestamp prefixed.
@@ -11,11 +11,15 @@ an exception is raised, which will lead to the entire supervisor script terminat
 exit code 1. That will stop the Docker container so that the Docker daemon can decide how
 to proceed depending on configuration. Usually that means restarting the container.
 
+If REPLICATION_MODE = 'standby', Postgres is started as hot standby of the primary at
+REPLICATION_PRIMARY_HOST. If the data directory isn't initialized yet, it is populated
+from a base backup of the primary first (which also configures streaming replication).
+
 """
 from asyncio import StreamReader, create_subprocess_shell
 from asyncio.subprocess import Process, PIPE
 from datetime import datetime, UTC
-from typing import Any, List
+from typing import Any, Dict, List
 import asyncio
 import logging
 import signal
@@ -36,7 +40,10 @@ class ProcessInfo():
         self._termination_signal = termination_signal
     
     def send_signal(self, signal : int):
-        self._process.send_signal(signal)
+        try:
+            self._process.send_signal(signal)
+        except ProcessLookupError:
+            pass # Process has already ended
 
     def terminate(self):
         self.send_signal(self._termination_signal)
@@ -45,6 +52,9 @@ class ProcessInfo():
 shutdown_requested : bool = False
 processes : List[ProcessInfo] = []
 
+BASE_BACKUP_ATTEMPTS = 10 # The primary might not be accepting connections yet when both containers start
+BASE_BACKUP_RETRY_DELAY = 5
+
 
 def setup_logging() -> None:
     """
@@ -91,14 +101,15 @@ async def log_lines_continuously(process_name : str, pipe_name : str, reader : S
         logging.info(f"[{process_name} > {pipe_name}] {line.decode('utf-8').rstrip(os.linesep)}")
 
 
-async def execute_subprocess_shell(name : str, command : str, termination_signal : int) -> int:
+async def execute_subprocess_shell(name : str, command : str, termination_signal : int, env : Dict[str, str] | None = None) -> int:
     """
     Starts a subprocess for the provided shell command and begins to continuously log
     its stdout and stderr streams to the console until the process terminates.
     Once that happens, the process's exit code is returned.
+    If env is provided, it is added to the subprocess's environment.
 
     """
-    process = await create_subprocess_shell(command, stdout=PIPE, stderr=PIPE)
+    process = await create_subprocess_shell(command, stdout=PIPE, stderr=PIPE, env={ **os.environ, **env } if env else None)
     
     global processes
     processes.append(ProcessInfo(process, termination_signal))
@@ -139,6 +150,69 @@ async def start_supervised_process(name : str, command : str, restart : bool = F
         raise Exception("Critical process has ended!")
 
 
+async def prepare_standby() -> None:
+    """
+    Populates the data directory from a base backup of the primary, unless it is already initialized.
+    The base backup writes standby.signal and primary_conninfo, so Postgres starts as streaming standby.
+    Raises an exception if no base backup could be taken.
+
+    """
+    pgdata = os.getenv('PGDATA') or '/var/lib/postgresql/data'
+    if os.path.isfile(os.path.join(pgdata, 'PG_VERSION')):
+        if not os.path.isfile(os.path.join(pgdata, 'standby.signal')):
+            logging.warning(f"[Supervisor] Data directory '{pgdata}' exists but isn't a standby (promoted?), starting as is.")
+        return
+
+    primary_host = os.getenv('REPLICATION_PRIMARY_HOST')
+    if not primary_host:
+        raise Exception("No primary host specified (REPLICATION_PRIMARY_HOST)!")
+
+    replication_password = os.getenv('REPLICATION_PASSWORD')
+    if not replication_password:
+        raise Exception("No replication password specified (REPLICATION_PASSWORD)!")
+
+    command = ' '.join([
+        'pg_basebackup',
+        f'--pgdata="{pgdata}"',
+        f'--host="{primary_host}"',
+        f'--port="{os.getenv("REPLICATION_PRIMARY_PORT") or "5432"}"',
+        f'--username="{os.getenv("REPLICATION_USER") or "replicator"}"',
+        '--wal-method=stream',
+        '--write-recovery-conf',
+        '--checkpoint=fast',
+        '--no-password',
+        *([ f'--slot="{os.getenv("REPLICATION_SLOT")}"' ] if os.getenv('REPLICATION_SLOT') else [])
+    ])
+    env = { 'PGPASSWORD': replication_password } # Passed through environment to keep it out of the logs
+
+    for attempt in range(1, BASE_BACKUP_ATTEMPTS + 1):
+        logging.info(f"[Supervisor] Taking base backup from primary '{primary_host}' (attempt {attempt}/{BASE_BACKUP_ATTEMPTS})...")
+        returncode = await execute_subprocess_shell("BaseBackup", command, signal.SIGTERM, env)
+        if returncode == 0:
+            logging.info(f"[Supervisor] Base backup complete, starting as standby.")
+            return
+        if shutdown_requested:
+            break
+        await asyncio.sleep(BASE_BACKUP_RETRY_DELAY)
+
+    raise Exception("Failed to take base backup from primary!")
+
+
+def get_postgres_command(replication_mode : str) -> str:
+    """
+    Returns the shell command starting Postgres for the provided replication mode.
+
+    """
+    command = '/usr/local/bin/docker-entrypoint.sh postgres -c log_line_prefix="%t "'
+    if replication_mode == 'standby':
+        # Queries on the standby (like backups) get cancelled when they conflict with WAL replay.
+        # hot_standby_feedback keeps the primary from vacuuming rows still needed by them (snapshot conflicts),
+        # max_standby_streaming_delay=-1 lets replay wait for them instead of cancelling them on any other
+        # conflict (like locks taken for DDL or vacuum truncation on the primary). Replay lag grows meanwhile.
+        command += ' -c hot_standby_feedback=on -c max_standby_streaming_delay=-1'
+    return command
+
+
 async def main():
     """
     Initializes supervised processes.
@@ -146,9 +220,16 @@ async def main():
 
     """
     try:
+        replication_mode = (os.getenv('REPLICATION_MODE') or 'primary').lower()
+        if replication_mode not in ['primary', 'standby']:
+            raise Exception(f"Unknown replication mode: {replication_mode}")
+
+        if replication_mode == 'standby':
+            await prepare_standby()
+
         # Start supervised processes
         await asyncio.gather(
-            start_supervised_process("Postgres", '/usr/local/bin/docker-entrypoint.sh postgres -c log_line_prefix="%t "', restart=False, critical=True, termination_signal=signal.SIGINT),
+            start_supervised_process("Postgres", get_postgres_command(replication_mode), restart=False, critical=True, termination_signal=signal.SIGINT),
             start_supervised_process("QuartAPI", 'python -u /api/run.py', restart=True, critical=False),
         )
         logging.info(f"[Supervisor] All processes have ended without indication of error.")
@@ -12,7 +12,7 @@ export CURRENT_GID=$(id -g)
 # The containers should run as CURRENT_UID and CURRENT_GID, since file permissions
 # are copied between containers and host. This way, the owner of the files on the host
 # is always the user that started the application.
-datafolders=("postgres" "backups" "logs")
+datafolders=("postgres" "backups" "logs" "postgres-standby" "logs-standby")
 for folder in "${datafolders[@]}"; do
     mkdir "./data/$folder"
     chown "$CURRENT_UID:$CURRENT_GID" "$DATA_ROOT/$folder"